@@ -3,46 +3,59 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import hashlib
+import inspect
 
 # --- Función de Datos ---
 # (Copiamos la función de la celda anterior)
-def simular_datos_pv():
+def simular_datos_pv(semilla=42):
+    # Generador con semilla: la simulación siempre produce los mismos datos,
+    # así el archivo parquet guardado es válido entre sesiones y reinicios
+    rng = np.random.default_rng(semilla)
     timestamps = pd.date_range(start='2025-07-01', periods=72, freq='h')
     horas_dia = np.arange(0, 72)
     ciclo_solar_base = np.sin(np.pi * (horas_dia % 24) / 24) ** 2
-    irradiancia_base = np.maximum(0, ciclo_solar_base * 1000 + np.random.normal(0, 5, 72))
+    irradiancia_base = np.maximum(0, ciclo_solar_base * 1000 + rng.normal(0, 5, 72))
     irradiancia_dia1 = irradiancia_base
     potencia_dia1 = irradiancia_dia1 * 0.15
-    irradiancia_dia2 = np.maximum(0, irradiancia_base * 0.4 + np.random.normal(0, 20, 72))
+    irradiancia_dia2 = np.maximum(0, irradiancia_base * 0.4 + rng.normal(0, 20, 72))
     potencia_dia2 = irradiancia_dia2 * 0.15
     irradiancia_dia3 = irradiancia_base
     potencia_dia3 = irradiancia_dia3 * 0.15
     potencia_dia3[24+11] *= 0.3
     potencia_dia3[24+14] *= 0.4
-    df_wide = pd.DataFrame(
-        data={'Potencia_Dia1': potencia_dia1, 'Irradiancia_Dia1': irradiancia_dia1,
-              'Potencia_Dia2': potencia_dia2, 'Irradiancia_Dia2': irradiancia_dia2,
-              'Potencia_Dia3': potencia_dia3, 'Irradiancia_Dia3': irradiancia_dia3},
-        index=timestamps)
-    df_reset = df_wide.reset_index().rename(columns={'index': 'Timestamp'})
-    df_d1 = df_reset[['Timestamp', 'Irradiancia_Dia1', 'Potencia_Dia1']].rename(
-        columns={'Irradiancia_Dia1': 'Irradiancia', 'Potencia_Dia1': 'Potencia'})
-    df_d1['Dia'] = 'Día 1 (Soleado)'
-    df_d2 = df_reset[['Timestamp', 'Irradiancia_Dia2', 'Potencia_Dia2']].rename(
-        columns={'Irradiancia_Dia2': 'Irradiancia', 'Potencia_Dia2': 'Potencia'})
-    df_d2['Dia'] = 'Día 2 (Nublado)'
-    df_d3 = df_reset[['Timestamp', 'Irradiancia_Dia3', 'Potencia_Dia3']].rename(
-        columns={'Irradiancia_Dia3': 'Irradiancia', 'Potencia_Dia3': 'Potencia'})
-    df_d3['Dia'] = 'Día 3 (Parcial)'
-    return pd.concat([df_d1, df_d2, df_d3])
+    # Armamos el formato largo directamente: concatenamos los arreglos de los 3 días
+    # y repetimos las etiquetas, en lugar de crear un DataFrame por día y unirlos
+    potencia = np.concatenate([potencia_dia1, potencia_dia2, potencia_dia3]).astype(np.float32)
+    irradiancia = np.concatenate([irradiancia_dia1, irradiancia_dia2, irradiancia_dia3]).astype(np.float32)
+    dias = np.repeat(np.array(['Día 1 (Soleado)', 'Día 2 (Nublado)', 'Día 3 (Parcial)']), 72)
+    return pd.DataFrame(
+        data={'Timestamp': np.tile(timestamps.values, 3), 'Irradiancia': irradiancia,
+              'Potencia': potencia, 'Dia': pd.Categorical(dias)})
 
 # --- Caching de Datos ---
 # ¡Importante! Usamos un "decorador" de cache.
 # Esto evita que Streamlit vuelva a simular los datos CADA VEZ 
 # que el usuario hace clic en algo.
+# Además guardamos la simulación en un archivo parquet (columnar y con los tipos
+# ya definidos), así al reiniciar la app solo hay que leerlo.
+# El nombre del archivo lleva una huella del código de simular_datos_pv:
+# si cambiamos la simulación, se genera un archivo nuevo en vez de leer datos viejos.
+HUELLA_SIMULACION = hashlib.sha1(inspect.getsource(simular_datos_pv).encode()).hexdigest()[:8]
+RUTA_PARQUET = f'datos_pv_{HUELLA_SIMULACION}.parquet'
+
 @st.cache_data
 def cargar_datos():
-    return simular_datos_pv()
+    try:
+        return pd.read_parquet(RUTA_PARQUET)
+    except FileNotFoundError:
+        pass  # Primera ejecución: todavía no hay archivo, simulamos los datos
+    df = simular_datos_pv()
+    try:
+        df.to_parquet(RUTA_PARQUET, compression='zstd')
+    except OSError:
+        pass  # Si no podemos escribir (p. ej. carpeta de solo lectura), usamos la simulación
+    return df
 
 # --- Construcción de la App ---
 df = cargar_datos()
@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import datetime
+import io
+import pathlib
 
 # --- Configuración de la Página ---
 # st.set_page_config() debe ser el primer comando de Streamlit
@@ -12,32 +16,159 @@ st.set_page_config(page_title="Dashboard de Rendimiento FV", page_icon="☀️",
 
 
 # --- Carga y Cacheo de Datos ---
-# Usamos @st.cache_data para que los datos se carguen solo una vez
-@st.cache_data
+# La ruta del CSV se hashea junto con su fecha de modificación:
+# si el archivo cambia, las caches se invalidan solas.
+# Streamlit compara el tipo exacto, por eso usamos la clase concreta (PosixPath/WindowsPath).
+HASH_ARCHIVO = {type(pathlib.Path()): lambda ruta: (str(ruta), ruta.stat().st_mtime)}
+
+
+# Usamos @st.cache_data para que los datos se carguen solo una vez.
+# Con persist='disk' el resultado también se guarda en disco y sobrevive a los reinicios.
+# La llave de esa cache sale del código de esta función, por eso el esquema va aquí dentro
+# y no como constante global: si lo cambiamos, la cache en disco se invalida.
+@st.cache_data(persist="disk", show_spinner=False, hash_funcs=HASH_ARCHIVO)
 def cargar_datos(ruta_csv):
-    df = pd.read_csv(ruta_csv)
+    # Columnas del CSV que realmente usamos y sus tipos
+    columnas = ["Timestamp", "Nombre_Inversor", "Potencia_AC_kW", "Irradiancia_GHI_W_m2"]
+    columnas_numericas = ["Potencia_AC_kW", "Irradiancia_GHI_W_m2"]
+    tipos_columnas = {
+        "Nombre_Inversor": "category",
+        "Potencia_AC_kW": "float32",
+        "Irradiancia_GHI_W_m2": "float32",
+    }
+
+    # Leemos solo las columnas que usa el dashboard y declaramos sus tipos,
+    # así el lector de pyarrow no tiene que inferirlos.
+    # on_bad_lines='skip' descarta las líneas corruptas que no tienen todas las columnas.
+    df = pd.read_csv(
+        ruta_csv,
+        engine="pyarrow",
+        usecols=columnas,
+        dtype=tipos_columnas,
+        on_bad_lines="skip",
+    )
 
     # Convertimos 'Timestamp' a datetime.
     # errors='coerce' convertirá las fechas malas (como '2loc 08:45:00') en 'NaT' (Not a Time)
-    df["Timestamp"] = pd.to_datetime(df["Timestamp"], errors="coerce")
+    # Con un formato explícito pandas no tiene que adivinarlo fila por fila,
+    # y cache=True evita volver a parsear los textos repetidos.
+    df["Timestamp"] = pd.to_datetime(
+        df["Timestamp"], format="%Y-%m-%d %H:%M:%S", errors="coerce", cache=True
+    )
 
     # ¡Importante! Eliminamos las filas que no se pudieron convertir (las que tienen NaT)
     df = df.dropna(subset=["Timestamp"])
 
-    # Extraemos 'Fecha' para el filtro de fecha
-    df["Fecha"] = df["Timestamp"].dt.date
+    # Guardamos el inversor como 'category': los filtros comparan códigos enteros
+    # en lugar de textos, y quitamos las categorías que quedaron sin filas.
+    df["Nombre_Inversor"] = df["Nombre_Inversor"].astype("category").cat.remove_unused_categories()
+
+    # Las columnas numéricas van en float32: la mitad de memoria que float64
+    # para las sumas, máximos y gráficos
+    df[columnas_numericas] = df[columnas_numericas].astype(np.float32)
+
+    # Ordenamos por inversor y luego por tiempo: las filas de cada inversor quedan
+    # contiguas y en orden cronológico, como esperan los gráficos de series de tiempo
+    df = df.sort_values(["Nombre_Inversor", "Timestamp"]).reset_index(drop=True)
     return df
 
 
+# --- Filtrado y KPIs Cacheados ---
+# Cada clic en un widget vuelve a ejecutar el script completo.
+# Cacheamos el filtrado y los KPIs usando como llave solo los valores de los filtros
+# (una tupla de inversores y dos fechas), nunca el DataFrame, que sería caro de hashear.
+@st.cache_data(hash_funcs=HASH_ARCHIVO)
+def filtrar_datos(ruta_csv, inversores, fecha_inicio, fecha_fin):
+    df = cargar_datos(ruta_csv)
+
+    # Comparamos directamente sobre el arreglo datetime64 de 'Timestamp':
+    # el rango va desde el inicio del primer día hasta el inicio del día siguiente al último.
+    inicio = np.datetime64(pd.Timestamp(fecha_inicio))
+    fin = np.datetime64(pd.Timestamp(fecha_fin) + pd.Timedelta(days=1))
+    timestamps = df["Timestamp"].values
+
+    # Para el inversor comparamos los códigos enteros de la categoría,
+    # así la máscara completa se arma sobre arreglos de NumPy sin crear Series intermedias
+    codigos = df["Nombre_Inversor"].cat.codes.values
+    codigos_seleccionados = np.flatnonzero(df["Nombre_Inversor"].cat.categories.isin(inversores))
+    mascara = np.isin(codigos, codigos_seleccionados) & (timestamps >= inicio) & (timestamps < fin)
+
+    return df[mascara]
+
+
+@st.cache_data(hash_funcs=HASH_ARCHIVO)
+def calcular_kpis(ruta_csv, inversores, fecha_inicio, fecha_fin):
+    df_filtrado = filtrar_datos(ruta_csv, inversores, fecha_inicio, fecha_fin)
+
+    # Calculamos todas las reducciones de una sola vez con agg
+    resumen = df_filtrado.agg({"Potencia_AC_kW": ["sum", "max"], "Irradiancia_GHI_W_m2": "max"})
+
+    # 1. Energía Total (kWh). La potencia está en kW, los intervalos son de 15 min (0.25h)
+    energia_total_kwh = resumen.loc["sum", "Potencia_AC_kW"] * 0.25  # 0.25h = 15 min
+    # 2. Potencia Pico (kW)
+    potencia_pico_kw = resumen.loc["max", "Potencia_AC_kW"]
+    # 3. Irradiancia Máxima
+    irradiancia_max = resumen.loc["max", "Irradiancia_GHI_W_m2"]
+    # 4. HSP (Horas Solares Pico Equivalentes)
+    # Es la energía total (kWh) dividida por la potencia pico del sistema (kWp)
+    # Asumimos una potencia pico de 50 kWp por inversor (lo simulamos así)
+    potencia_pico_sistema_kwp = 50 * len(inversores)
+    hsp = energia_total_kwh / potencia_pico_sistema_kwp
+    return energia_total_kwh, potencia_pico_kw, irradiancia_max, hsp
+
+
+@st.cache_data(hash_funcs=HASH_ARCHIVO)
+def filtrar_diurnos(ruta_csv, inversores, fecha_inicio, fecha_fin):
+    # Filtramos solo datos diurnos para un gráfico más limpio.
+    # La máscara se calcula sobre el arreglo float32 y solo copiamos las columnas
+    # que usan el scatter y el boxplot
+    df_filtrado = filtrar_datos(ruta_csv, inversores, fecha_inicio, fecha_fin)
+    mascara = df_filtrado["Irradiancia_GHI_W_m2"].values > 50.0
+    df_diurno = df_filtrado.loc[mascara, ["Nombre_Inversor", "Irradiancia_GHI_W_m2", "Potencia_AC_kW"]]
+
+    # Quitamos las categorías de los inversores no seleccionados;
+    # si no, Seaborn reserva una caja vacía para cada una
+    return df_diurno.assign(
+        Nombre_Inversor=df_diurno["Nombre_Inversor"].cat.remove_unused_categories()
+    )
+
+
+@st.cache_data(hash_funcs=HASH_ARCHIVO)
+def graficar_boxplot(ruta_csv, inversores, fecha_inicio, fecha_fin):
+    # Matplotlib tarda en rasterizar la figura, así que guardamos en la cache
+    # los bytes del PNG ya generado y no la figura
+    df_diurno = filtrar_diurnos(ruta_csv, inversores, fecha_inicio, fecha_fin)
+
+    # Creamos la figura sin pyplot: esta función se comparte entre sesiones y pyplot
+    # usa un estado global donde dos ejecuciones simultáneas podrían mezclarse
+    fig_box = Figure()
+    ax_box = fig_box.subplots()
+    sns.boxplot(
+        data=df_diurno,
+        x="Nombre_Inversor",
+        y="Potencia_AC_kW",
+        ax=ax_box,
+    )
+    ax_box.set_title("Distribución de la Potencia Diurna")
+    ax_box.set_xlabel("Inversor")
+    ax_box.set_ylabel("Potencia (kW)")
+
+    buffer = io.BytesIO()
+    # dpi=200 es la misma resolución que usa st.pyplot
+    fig_box.savefig(buffer, format="png", dpi=200, bbox_inches="tight")
+    return buffer.getvalue()
+
+
 # Cargamos los datos
-df = cargar_datos("datos_pv.csv")
+RUTA_DATOS = pathlib.Path("datos_pv.csv")
+df = cargar_datos(RUTA_DATOS)
 
 # --- Barra Lateral (Filtros) ---
 st.sidebar.header("Filtros del Dashboard ☀️")
 
 # Filtro 1: Selección de Inversor
-# Obtenemos la lista única de inversores
-lista_inversores = df["Nombre_Inversor"].unique()
+# Obtenemos la lista única de inversores (las categorías de la columna)
+lista_inversores = list(df["Nombre_Inversor"].cat.categories)
 # Usamos multiselect para permitir seleccionar uno o ambos
 inversores_seleccionados = st.sidebar.multiselect(
     "Selecciona Inversor(es):",
@@ -46,9 +177,9 @@ inversores_seleccionados = st.sidebar.multiselect(
 )
 
 # Filtro 2: Selector de Rango de Fechas
-# Obtenemos las fechas min y max para el selector
-min_fecha = df["Fecha"].min()
-max_fecha = df["Fecha"].max()
+# Obtenemos las fechas min y max para el selector (directo sobre 'Timestamp')
+min_fecha = df["Timestamp"].min().date()
+max_fecha = df["Timestamp"].max().date()
 
 # st.date_input permite seleccionar un rango
 fechas_seleccionadas = st.sidebar.date_input(
@@ -67,17 +198,20 @@ except ValueError:
     st.stop()  # Detiene la ejecución si el rango no es válido
 
 # --- Filtrado del DataFrame ---
-# Aplicamos los filtros seleccionados al DataFrame
-df_filtrado = df[
-    (df["Nombre_Inversor"].isin(inversores_seleccionados))
-    & (df["Fecha"] >= fecha_inicio)
-    & (df["Fecha"] <= fecha_fin)
-]
+# Aplicamos los filtros seleccionados al DataFrame (la lista se pasa como tupla para la cache)
+filtros = (RUTA_DATOS, tuple(inversores_seleccionados), fecha_inicio, fecha_fin)
+df_filtrado = filtrar_datos(*filtros)
 
 if df_filtrado.empty:
     st.warning("No hay datos para los filtros seleccionados.")
     st.stop()
 
+# Separamos los datos por inversor una sola vez y reutilizamos cada trozo en los gráficos
+grupos = {
+    inversor: df_inv
+    for inversor, df_inv in df_filtrado.groupby("Nombre_Inversor", observed=True, sort=False)
+}
+
 # --- Página Principal ---
 st.title("Dashboard de Rendimiento Fotovoltaico ☀️")
 st.markdown(
@@ -88,17 +222,7 @@ st.markdown(
 st.header("KPIs de Rendimiento")
 
 # Calculamos los KPIs basados en los datos filtrados
-# 1. Energía Total (kWh). La potencia está en kW, los intervalos son de 15 min (0.25h)
-energia_total_kwh = df_filtrado["Potencia_AC_kW"].sum() * 0.25  # 0.25h = 15 min
-# 2. Potencia Pico (kW)
-potencia_pico_kw = df_filtrado["Potencia_AC_kW"].max()
-# 3. Irradiancia Máxima
-irradiancia_max = df_filtrado["Irradiancia_GHI_W_m2"].max()
-# 4. HSP (Horas Solares Pico Equivalentes)
-# Es la energía total (kWh) dividida por la potencia pico del sistema (kWp)
-# Asumimos una potencia pico de 50 kWp por inversor (lo simulamos así)
-potencia_pico_sistema_kwp = 50 * len(inversores_seleccionados)
-hsp = energia_total_kwh / potencia_pico_sistema_kwp
+energia_total_kwh, potencia_pico_kw, irradiancia_max, hsp = calcular_kpis(*filtros)
 
 # Mostramos los KPIs en columnas
 col1, col2, col3, col4 = st.columns(4)
@@ -115,9 +239,11 @@ st.header("Análisis de Series de Tiempo")
 # Creamos una figura de Plotly con ejes Y secundarios
 fig_ts = make_subplots(specs=[[{"secondary_y": True}]])
 
-# Agrupamos por inversor para pintar una línea por cada uno
-for inversor in df_filtrado["Nombre_Inversor"].unique():
-    df_inv = df_filtrado[df_filtrado["Nombre_Inversor"] == inversor]
+# Pintamos una línea por cada inversor seleccionado usando los grupos ya calculados
+for inversor in inversores_seleccionados:
+    if inversor not in grupos:
+        continue  # Este inversor no tiene datos en el rango de fechas
+    df_inv = grupos[inversor]
 
     # Añadir traza de Potencia
     fig_ts.add_trace(
@@ -132,12 +258,26 @@ for inversor in df_filtrado["Nombre_Inversor"].unique():
     )
 
 # Añadimos la Irradiancia (solo una vez)
-# Tomamos la media si hay dos inversores (la irradiancia debería ser la misma)
-df_irradiancia = df_filtrado.groupby("Timestamp")["Irradiancia_GHI_W_m2"].mean().reset_index()
+# Tomamos la media si hay dos inversores (la irradiancia debería ser la misma).
+# En datos_pv.csv cada inversor perdió filas corruptas distintas, así que con ambos
+# seleccionados los instantes no coinciden y lo normal es usar el groupby de abajo.
+tiempos = [df_inv["Timestamp"].values for df_inv in grupos.values()]
+if all(np.array_equal(tiempos[0], t) for t in tiempos[1:]):
+    # Si todos los inversores tienen los mismos instantes (por ejemplo, uno solo),
+    # apilamos las columnas y promediamos cada fila, sin necesidad de un groupby
+    tiempo_irradiancia = tiempos[0]
+    irradiancia_media = np.column_stack(
+        [df_inv["Irradiancia_GHI_W_m2"].values for df_inv in grupos.values()]
+    ).mean(axis=1)
+else:
+    # Si faltan filas en algún inversor (el caso habitual con ambos), agrupamos por instante
+    df_irradiancia = df_filtrado.groupby("Timestamp")["Irradiancia_GHI_W_m2"].mean()
+    tiempo_irradiancia = df_irradiancia.index
+    irradiancia_media = df_irradiancia.values
 fig_ts.add_trace(
     go.Scatter(
-        x=df_irradiancia["Timestamp"],
-        y=df_irradiancia["Irradiancia_GHI_W_m2"],
+        x=tiempo_irradiancia,
+        y=irradiancia_media,
         name="Irradiancia (W/m²)",
         mode="lines",
         line=dict(color="rgba(255, 165, 0, 0.5)", dash="dot"),  # Naranja punteado
@@ -153,7 +293,7 @@ fig_ts.update_layout(
     yaxis2_title="Irradiancia GHI (W/m²)",
     legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
 )
-st.plotly_chart(fig_ts, use_container_width=True)
+st.plotly_chart(fig_ts, width="stretch")
 
 
 # --- Gráficos de Análisis Secundarios ---
@@ -162,27 +302,29 @@ col_graf1, col_graf2 = st.columns(2)
 
 with col_graf1:
     # Gráfico 1: Curva de Potencia (Irradiancia vs Potencia)
-    # Usamos Seaborn para esto, ya que 'hue' es muy conveniente
+    # Usamos Plotly Express con render_mode='webgl': el navegador dibuja los puntos
+    # en la GPU y 'color' cumple el mismo papel que el 'hue' de Seaborn
     st.subheader("Curva de Potencia (Scatter Plot)")
 
     # Filtramos solo datos diurnos para un gráfico más limpio
-    df_diurno = df_filtrado[df_filtrado["Irradiancia_GHI_W_m2"] > 50]
+    df_diurno = filtrar_diurnos(*filtros)
 
-    fig_scatter, ax_scatter = plt.subplots()
-    sns.scatterplot(
-        data=df_diurno,
+    fig_scatter = px.scatter(
+        df_diurno,
         x="Irradiancia_GHI_W_m2",
         y="Potencia_AC_kW",
-        hue="Nombre_Inversor",
-        alpha=0.5,
-        s=5,  # Tamaño de punto pequeño
-        ax=ax_scatter,
+        color="Nombre_Inversor",
+        opacity=0.5,
+        render_mode="webgl",
+        title="Potencia vs. Irradiancia",
+        labels={
+            "Irradiancia_GHI_W_m2": "Irradiancia (W/m²)",
+            "Potencia_AC_kW": "Potencia (kW)",
+            "Nombre_Inversor": "Inversor",
+        },
     )
-    ax_scatter.set_title("Potencia vs. Irradiancia")
-    ax_scatter.set_xlabel("Irradiancia (W/m²)")
-    ax_scatter.set_ylabel("Potencia (kW)")
-    ax_scatter.grid(True)
-    st.pyplot(fig_scatter)
+    fig_scatter.update_traces(marker=dict(size=4))  # Tamaño de punto pequeño
+    st.plotly_chart(fig_scatter, width="stretch")
     st.caption(
         """
     **Análisis:** - **Día 1 (07-01):** Curva perfecta.
@@ -195,17 +337,9 @@ with col_graf2:
     # Gráfico 2: Distribución de Potencia (Boxplot)
     st.subheader("Distribución de Potencia por Inversor")
 
-    fig_box, ax_box = plt.subplots()
-    sns.boxplot(
-        data=df_diurno,  # Usamos los mismos datos diurnos
-        x="Nombre_Inversor",
-        y="Potencia_AC_kW",
-        ax=ax_box,
-    )
-    ax_box.set_title("Distribución de la Potencia Diurna")
-    ax_box.set_xlabel("Inversor")
-    ax_box.set_ylabel("Potencia (kW)")
-    st.pyplot(fig_box)
+    # Usamos los mismos datos diurnos; la imagen se genera solo cuando cambian los filtros
+    png_boxplot = graficar_boxplot(*filtros)
+    st.image(png_boxplot, width="stretch")
     st.caption(
         """
     **Análisis:**